@@ -13,6 +13,9 @@ SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', 'dev-secret-for-local-testing')
 DEBUG = os.getenv('DJANGO_DEBUG', '1') == '1'
 DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite').strip().lower()
 DB_DRIVER = os.getenv('DB_DRIVER', 'mysqlclient').strip().lower()
+# Seconds to keep DB connections open between requests; set to 0 when running
+# under gevent/eventlet workers, where persistent connections leak per greenlet.
+DB_CONN_MAX_AGE = int(os.getenv('DJANGO_CONN_MAX_AGE', '60'))
 
 if DB_ENGINE == 'mysql' and DB_DRIVER == 'pymysql':
     import pymysql
@@ -78,6 +81,8 @@ def _mysql_db(name_env, default_name, user_env='DB_USER', pass_env='DB_PASSWORD'
         'PASSWORD': os.getenv(pass_env, os.getenv('DB_PASSWORD', '')),
         'HOST': os.getenv('DB_HOST', '127.0.0.1'),
         'PORT': int(os.getenv('DB_PORT', '3306')),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'charset': 'utf8mb4',
         },
@@ -94,6 +99,7 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
             'OPTIONS': {
                 'timeout': 30,
             },
@@ -101,6 +107,7 @@ else:
         'cache': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db_cache.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
             'OPTIONS': {
                 'timeout': 30,
             },
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maria_cache', '0004_reseller_name_norm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(max_length=64)),
+                ('model_name', models.CharField(max_length=64)),
+                ('checksum', models.CharField(max_length=32)),
+                ('row_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={'unique_together': {('source_name', 'model_name')}},
+        ),
+    ]
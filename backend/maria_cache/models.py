@@ -1,5 +1,9 @@
 from django.db import models
 
+# Every cache table's unique_together starts with source_name, so that index
+# already serves per-source filters (and, with the pk InnoDB appends, covers the
+# key scan in maria_cache.sync._delete_stale). No separate source_name index.
+
 
 class Reseller(models.Model):
     source_name = models.CharField(max_length=64)
@@ -148,3 +152,17 @@ class ResellerPermit(models.Model):
 
     class Meta:
         unique_together = ('source_name', 'reseller_id', 'visp_id', 'permit_item_id')
+
+
+class SyncState(models.Model):
+    source_name = models.CharField(max_length=64)
+    model_name = models.CharField(max_length=64)
+    checksum = models.CharField(max_length=32)
+    row_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('source_name', 'model_name')
+
+    def __str__(self):
+        return f"{self.source_name}:{self.model_name}"
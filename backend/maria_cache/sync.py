@@ -1,7 +1,15 @@
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing, nullcontext
+from functools import partial
+from itertools import islice, repeat
 
-from django.db import transaction
+import pandas as pd
+from django.db import connections, transaction
+from django.db.models.constants import OnConflict
+from pymysql.cursors import Cursor, SSCursor
 
 from .models import (
     Center,
@@ -15,195 +23,490 @@ from .models import (
     StatusResellerAccess,
     StatusVispAccess,
     Supporter,
+    SyncState,
     Visp,
 )
 
 logger = logging.getLogger(__name__)
 
+SOURCE_KEY = ('source_name', 'source_id')
+STALE_DELETE_CHUNK = 1000
+FETCH_CHUNK = 5000
+# SQLite allows a single writer; sources syncing in parallel take turns on the
+# cache writes (fetches still overlap) instead of timing out on the file lock.
+_SQLITE_WRITE_LOCK = threading.Lock()
+
+# Rows per INSERT, tuned by row width: narrow id/flag tables take large batches,
+# tables with long names smaller ones. Override per model with
+# CACHE_SYNC_BATCH_SIZE_<MODEL> (e.g. CACHE_SYNC_BATCH_SIZE_SERVICE=250), or for
+# all models with CACHE_SYNC_BATCH_SIZE.
+BATCH_SIZES = {
+    'Reseller': 2000,
+    'Visp': 2000,
+    'Center': 2000,
+    'Supporter': 2000,
+    'Status': 2000,
+    'Service': 500,
+    'ResellerPermit': 5000,
+    'ServiceResellerAccess': 5000,
+    'StatusResellerAccess': 5000,
+    'ServiceVispAccess': 5000,
+    'StatusVispAccess': 5000,
+    'CenterVispAccess': 5000,
+}
+
+# (key, source table, SELECT) for each cached table, in sync order.
+REFERENCE_QUERIES = (
+    ('resellers', 'Hreseller', "SELECT Reseller_Id, ResellerName, ISEnable FROM Hreseller"),
+    ('visps', 'Hvisp', "SELECT Visp_Id, VispName, ISEnable FROM Hvisp"),
+    ('centers', 'Hcenter', "SELECT Center_Id, CenterName, ISEnable, VispAccess FROM Hcenter"),
+    ('supporters', 'Hsupporter', "SELECT Supporter_Id, SupporterName, ISEnable FROM Hsupporter"),
+    ('statuses', 'Hstatus', "SELECT Status_Id, StatusName, ISEnable, ResellerAccess, VispAccess FROM Hstatus"),
+    ('services', 'Hservice', "SELECT Service_Id, ServiceName, ISEnable, IsDel, ResellerAccess, VispAccess FROM Hservice"),
+    ('reseller_permits', 'Hreseller_permit', "SELECT Reseller_Permit_Id, Reseller_Id, Visp_Id, ISPermit, PermitItem_Id FROM Hreseller_permit"),
+    ('service_reseller', 'Hservice_reselleraccess', "SELECT Service_ResellerAccess_Id, Service_Id, Reseller_Id, Checked FROM Hservice_reselleraccess"),
+    ('status_reseller', 'Hstatus_reselleraccess', "SELECT Status_ResellerAccess_Id, Status_Id, Reseller_Id, Checked FROM Hstatus_reselleraccess"),
+    ('service_visp', 'Hservice_vispaccess', "SELECT Service_VispAccess_Id, Service_Id, Visp_Id, Checked FROM Hservice_vispaccess"),
+    ('status_visp', 'Hstatus_vispaccess', "SELECT Status_VispAccess_Id, Status_Id, Visp_Id, Checked FROM Hstatus_vispaccess"),
+    ('center_visp', 'Hcenter_vispaccess', "SELECT Center_VispAccess_Id, Center_Id, Visp_Id, Checked FROM Hcenter_vispaccess"),
+)
+
 
 def _bool_yes(value):
     return str(value).strip().lower() == 'yes'
 
 
-def _fetch_rows(conn, query):
-    with conn.cursor() as cur:
-        cur.execute(query)
+def _yes_mask(values):
+    """Vectorized `_bool_yes` over a column of Yes/No flags."""
+    return pd.Series(values, dtype=object).astype(str).str.strip().str.lower().eq('yes').tolist()
+
+
+def _rowwise(builder):
+    """Adapt a per-row builder to the chunk builders `_replace_for_source` takes."""
+    return lambda chunk: [builder(row) for row in chunk]
+
+
+def _access_builder(source_name):
+    """Raw chunk builder for the (pk, id, id, Checked) access tables.
+
+    Emits (source_name, id, id, checked) tuples for `_raw_bulk_upsert`.
+    """
+    def build(chunk):
+        df = pd.DataFrame.from_records(chunk, columns=['pk', 'first', 'second', 'checked'])
+        ids = df[['first', 'second']].fillna(0).astype('int64')
+        # tolist() hands the DB driver plain Python ints rather than numpy scalars.
+        return list(zip(
+            repeat(source_name),
+            ids['first'].to_numpy().tolist(),
+            ids['second'].to_numpy().tolist(),
+            _yes_mask(df['checked']),
+        ))
+    return build
+
+
+def _permit_builder(source_name):
+    """Raw chunk builder for Hreseller_permit rows.
+
+    Emits (source_name, reseller_id, visp_id, permit_item_id, is_permit) tuples.
+    """
+    def build(chunk):
+        _, reseller_ids, visp_ids, permits, item_ids = zip(*chunk)
+        return [
+            (source_name, reseller_id or 0, visp_id or 0, item_id, flag)
+            for reseller_id, visp_id, item_id, flag in zip(reseller_ids, visp_ids, item_ids, _yes_mask(permits))
+        ]
+    return build
+
+
+def _limited(query, limit=None):
+    if limit and limit > 0:
+        return f"{query} LIMIT {int(limit)}"
+    return query
+
+
+def _fetch_rows(conn, query, limit=None):
+    with conn.cursor(Cursor) as cur:
+        cur.execute(_limited(query, limit))
         return cur.fetchall()
 
 
-def _replace_for_source(model, source_name, rows, builder, db_alias='cache', dry_run=False, batch_size=None):
+def _iter_rows(conn, query, limit=None, chunk=FETCH_CHUNK):
+    """Yield rows from an unbuffered server-side cursor, `chunk` at a time.
+
+    fetchmany keeps the per-row Python overhead off the read loop while the
+    caller builds and inserts the previous chunk. The connection is busy until
+    the generator is exhausted or closed, so wrap it in `closing()`; only one
+    stream may be open per connection at a time.
+    """
+    with conn.cursor(SSCursor) as cur:
+        cur.execute(_limited(query, limit))
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            yield from rows
+
+
+def _checksums_enabled():
+    return os.getenv('CACHE_SYNC_CHECKSUM', '0') == '1'
+
+
+def _table_checksums(conn, tables):
+    """Return {table: CHECKSUM TABLE value} computed server-side by MariaDB.
+
+    Tables the server cannot checksum are left out, so they are always synced.
+    On InnoDB this is a full scan of each table under a read lock, against the
+    live source database, and changed tables are then read again by the sync
+    SELECT. It is therefore opt-in (CACHE_SYNC_CHECKSUM=1): worth it only when
+    the tables are large, rarely change, and the source can take the scans.
+    """
+    try:
+        with conn.cursor(Cursor) as cur:
+            cur.execute('CHECKSUM TABLE ' + ', '.join(tables))
+            rows = cur.fetchall()
+    except Exception as exc:
+        logger.warning("CHECKSUM TABLE failed; syncing all tables: %s", exc)
+        return {}
+    # The server reports tables as `db.table`.
+    return {
+        table.rsplit('.', 1)[-1].lower(): str(checksum)
+        for table, checksum in rows
+        if checksum is not None
+    }
+
+
+def _unchanged_count(model, source_name, checksum, db_alias='cache'):
+    """Cached row count if `model` was last synced from the same checksum, else None."""
+    if checksum is None:
+        return None
+    state = SyncState.objects.using(db_alias).filter(source_name=source_name, model_name=model.__name__).first()
+    if state is None or state.checksum != checksum:
+        return None
+    # Guard against the cache table having been emptied or edited since.
+    if model.objects.using(db_alias).filter(source_name=source_name).count() != state.row_count:
+        return None
+    return state.row_count
+
+
+def _record_state(model, source_name, checksum, db_alias='cache'):
+    states = SyncState.objects.using(db_alias)
+    lookup = {'source_name': source_name, 'model_name': model.__name__}
+    if checksum is None:
+        states.filter(**lookup).delete()
+        return
+    row_count = model.objects.using(db_alias).filter(source_name=source_name).count()
+    states.update_or_create(defaults={'checksum': checksum, 'row_count': row_count}, **lookup)
+
+
+def _fetch_parallelism():
+    return int(os.getenv('CACHE_SYNC_FETCH_PARALLEL', '1'))
+
+
+def _batch_size_for(model):
+    name = model.__name__
+    override = os.getenv(f'CACHE_SYNC_BATCH_SIZE_{name.upper()}', '').strip()
+    if override:
+        return int(override)
+    # An explicit global setting (e.g. lowered for max_allowed_packet) still
+    # wins over the per-model defaults.
+    override = os.getenv('CACHE_SYNC_BATCH_SIZE', '').strip()
+    if override:
+        return int(override)
+    return BATCH_SIZES.get(name, 1000)
+
+
+def _delete_stale(manager, source_name, seen, key_fields):
+    """Delete cached rows for `source_name` whose key is not in `seen`.
+
+    Rows are scanned newest first so that, when a key shows up more than once
+    (e.g. a NULL `permit_item_id`, which unique indexes do not dedupe), only the
+    freshly upserted copy survives.
+    """
+    if not seen:
+        # The whole source partition is stale: one set-based DELETE, no key scan.
+        deleted, _ = manager.filter(source_name=source_name).delete()
+        return deleted
+    kept = set()
+    stale = []
+    existing = manager.filter(source_name=source_name).order_by('-pk').values_list('pk', *key_fields)
+    for row in existing.iterator():
+        key = row[1:]
+        if key in seen and key not in kept:
+            kept.add(key)
+        else:
+            stale.append(row[0])
+    for start in range(0, len(stale), STALE_DELETE_CHUNK):
+        manager.filter(pk__in=stale[start:start + STALE_DELETE_CHUNK]).delete()
+    return len(stale)
+
+
+def _raw_bulk_upsert(connection, table, columns, conflict_columns, update_columns, rows):
+    """Multi-row INSERT of `rows` that updates `update_columns` on key conflicts.
+
+    Bypasses model construction and the ORM's per-object SQL compilation; one
+    VALUES group per row, split only where the backend caps query parameters.
+    """
+    qn = connection.ops.quote_name
+    # Same suffix bulk_create(update_conflicts=True) emits: ON DUPLICATE KEY
+    # UPDATE (with the row alias on MySQL 8.0.19+) or ON CONFLICT ... EXCLUDED.
+    on_conflict = connection.ops.on_conflict_suffix_sql(
+        columns, OnConflict.UPDATE, update_columns, conflict_columns,
+    )
+    prefix = f"INSERT INTO {qn(table)} ({', '.join(qn(c) for c in columns)}) VALUES "
+    group = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    step = max(1, connection.ops.bulk_batch_size(columns, rows))
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), step):
+            part = rows[start:start + step]
+            cursor.execute(
+                prefix + ', '.join([group] * len(part)) + ' ' + on_conflict,
+                [value for row in part for value in row],
+            )
+
+
+def _replace_for_source(model, source_name, rows, builder, unique_fields, db_alias='cache', dry_run=False, batch_size=None, raw=False):
+    """Upsert `rows` (any iterable) for one source and drop keys that vanished.
+
+    Rows are consumed in `batch_size` slices, so a streamed result set is never
+    held in memory as a whole; `builder` turns each slice into model instances,
+    or with `raw=True` into tuples ordered as `unique_fields` followed by the
+    remaining columns, written with `_raw_bulk_upsert`. Returns the number of
+    rows seen.
+
+    The slices are read inside the table's transaction. Pass a live stream
+    only on MySQL; elsewhere (SQLite) that holds the database-wide write lock
+    for the whole network read, so callers buffer the table first.
+    """
     if dry_run:
-        return len(rows)
-    model.objects.using(db_alias).filter(source_name=source_name).delete()
-    if not rows:
-        return 0
-    items = [builder(row) for row in rows]
-    model.objects.using(db_alias).bulk_create(items, ignore_conflicts=True, batch_size=batch_size)
-    return len(items)
+        return sum(1 for _ in rows)
+    manager = model.objects.using(db_alias)
+    if batch_size is None:
+        batch_size = _batch_size_for(model)
+    update_fields = [
+        f.name for f in model._meta.concrete_fields
+        if not f.primary_key and f.name not in unique_fields
+    ]
+    connection = connections[db_alias]
+    options = {}
+    # MySQL's ON DUPLICATE KEY UPDATE has no conflict target; passing one raises.
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = unique_fields
+    key_fields = [f for f in unique_fields if f != 'source_name']
+    column = model._meta.get_field
+    raw_columns = [column(f).column for f in (*unique_fields, *update_fields)]
+    seen = set()
+    count = 0
+    rows = iter(rows)
+    # One transaction per table keeps undo/lock lifetimes short on big syncs.
+    with transaction.atomic(using=db_alias):
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            items = builder(chunk)
+            if raw:
+                _raw_bulk_upsert(
+                    connection,
+                    model._meta.db_table,
+                    raw_columns,
+                    raw_columns[:len(unique_fields)],
+                    raw_columns[len(unique_fields):],
+                    items,
+                )
+                # unique_fields always starts with source_name.
+                seen.update(item[1:len(unique_fields)] for item in items)
+            else:
+                manager.bulk_create(
+                    items,
+                    update_conflicts=True,
+                    update_fields=update_fields,
+                    batch_size=batch_size,
+                    **options,
+                )
+                seen.update(tuple(getattr(item, f) for f in key_fields) for item in items)
+            count += len(items)
+        _delete_stale(manager, source_name, seen, key_fields)
+    return count
+
+
+def _fetch_reference_rows(source_name, queries, limit=None):
+    """Fetch the given REFERENCE_QUERIES entries for one source, keyed by key.
+
+    Used when CACHE_SYNC_FETCH_PARALLEL > 1: the SELECTs run concurrently, each
+    on its own short-lived connection (a MySQL connection cannot multiplex
+    cursors), so the results are materialized before any writes start.
+    """
+    from reports.db import get_conn
+
+    def _fetch(query):
+        conn = get_conn(source_name=source_name)
+        try:
+            return _fetch_rows(conn, query, limit=limit)
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=_fetch_parallelism(), thread_name_prefix='cache-fetch') as executor:
+        futures = {key: executor.submit(_fetch, query) for key, _, query in queries}
+        return {key: future.result() for key, future in futures.items()}
+
+
+def _reference_tables(name):
+    """Map each REFERENCE_QUERIES key to (model, unique_fields, chunk builder, raw).
+
+    Rows are plain tuples, so builders index columns in the order of the
+    matching SELECT; keep the two in step when editing either.
+    """
+    # Bound once per source so the per-row builders only touch locals.
+    bool_yes = _bool_yes
+    new_reseller = partial(Reseller, source_name=name)
+    new_visp = partial(Visp, source_name=name)
+    new_center = partial(Center, source_name=name)
+    new_supporter = partial(Supporter, source_name=name)
+    new_status = partial(Status, source_name=name)
+    new_service = partial(Service, source_name=name)
+
+    def build_reseller(r):
+        raw_name = r[1] or ''
+        return new_reseller(
+            source_id=r[0],
+            name=raw_name,
+            name_norm=raw_name.strip().lower(),
+            is_enabled=bool_yes(r[2]),
+        )
+
+    return {
+        'resellers': (Reseller, SOURCE_KEY, _rowwise(build_reseller), False),
+        'visps': (Visp, SOURCE_KEY, _rowwise(lambda r: new_visp(
+            source_id=r[0],
+            name=r[1] or '',
+            is_enabled=bool_yes(r[2]),
+        )), False),
+        'centers': (Center, SOURCE_KEY, _rowwise(lambda r: new_center(
+            source_id=r[0],
+            name=r[1] or '',
+            is_enabled=bool_yes(r[2]),
+            visp_access=r[3] or 'All',
+        )), False),
+        'supporters': (Supporter, SOURCE_KEY, _rowwise(lambda r: new_supporter(
+            source_id=r[0],
+            name=r[1] or '',
+            is_enabled=bool_yes(r[2]),
+        )), False),
+        'statuses': (Status, SOURCE_KEY, _rowwise(lambda r: new_status(
+            source_id=r[0],
+            name=r[1] or '',
+            is_enabled=bool_yes(r[2]),
+            reseller_access=r[3] or 'All',
+            visp_access=r[4] or 'All',
+        )), False),
+        'services': (Service, SOURCE_KEY, _rowwise(lambda r: new_service(
+            source_id=r[0],
+            name=r[1] or '',
+            is_enabled=bool_yes(r[2]),
+            is_deleted=bool_yes(r[3]),
+            reseller_access=r[4] or 'All',
+            visp_access=r[5] or 'All',
+        )), False),
+        'reseller_permits': (ResellerPermit, ('source_name', 'reseller_id', 'visp_id', 'permit_item_id'), _permit_builder(name), True),
+        'service_reseller': (ServiceResellerAccess, ('source_name', 'service_id', 'reseller_id'), _access_builder(name), True),
+        'status_reseller': (StatusResellerAccess, ('source_name', 'status_id', 'reseller_id'), _access_builder(name), True),
+        'service_visp': (ServiceVispAccess, ('source_name', 'service_id', 'visp_id'), _access_builder(name), True),
+        'status_visp': (StatusVispAccess, ('source_name', 'status_id', 'visp_id'), _access_builder(name), True),
+        'center_visp': (CenterVispAccess, ('source_name', 'center_id', 'visp_id'), _access_builder(name), True),
+    }
+
+
+def _sync_one_source(source, dry_run=False, limit=None, verbose=False, db_alias='cache'):
+    from reports.db import get_conn
+    name = source.get('name')
+    logger.info("Starting cache sync for %s", name)
+    tables = _reference_tables(name)
+    conn = get_conn(source_name=name)
+    try:
+        counts = {}
+        pending = list(REFERENCE_QUERIES)
+        checksums = {}
+        # A limited or dry run never leaves a complete table behind to compare against.
+        use_checksums = _checksums_enabled() and not dry_run and not (limit and limit > 0)
+        if use_checksums:
+            checksums = _table_checksums(conn, [table for _, table, _ in REFERENCE_QUERIES])
+            pending = []
+            for key, table, query in REFERENCE_QUERIES:
+                cached = _unchanged_count(tables[key][0], name, checksums.get(table.lower()), db_alias=db_alias)
+                if cached is None:
+                    pending.append((key, table, query))
+                else:
+                    counts[key] = cached
+                    logger.info("Skipping %s for %s; source unchanged", key.replace('_', ' '), name)
+
+        if _fetch_parallelism() > 1:
+            fetched = _fetch_reference_rows(name, pending, limit=limit)
+
+            def _rows(key, query):
+                yield from fetched.pop(key)
+        else:
+            def _rows(key, query):
+                return _iter_rows(conn, query, limit=limit)
+
+        if dry_run:
+            logger.info("Dry-run mode enabled; skipping writes for %s", name)
+
+        vendor = connections[db_alias].vendor
+        serial_writes = not dry_run and vendor == 'sqlite'
+        # Streaming into the open transaction is only done on MySQL (row locks);
+        # other backends get one table buffered so the transaction and write
+        # lock cover the writes alone, not the MariaDB read.
+        buffer_rows = not dry_run and vendor != 'mysql'
+        for key, table, query in pending:
+            model, unique_fields, builder, raw = tables[key]
+            with closing(_rows(key, query)) as rows:
+                if buffer_rows:
+                    rows = list(rows)
+                with _SQLITE_WRITE_LOCK if serial_writes else nullcontext():
+                    counts[key] = _replace_for_source(
+                        model, name, rows, builder, unique_fields, db_alias=db_alias, dry_run=dry_run, raw=raw,
+                    )
+                    if use_checksums:
+                        # Only after the table's data has committed.
+                        _record_state(model, name, checksums.get(table.lower()), db_alias=db_alias)
+            logger.info("Synced %s %s", counts[key], key.replace('_', ' '))
+
+        counts = {key: counts[key] for key, _, _ in REFERENCE_QUERIES}
+        if verbose:
+            logger.info("Counts for %s: %s", name, counts)
+
+        logger.info("Maria cache sync completed for %s", name)
+        return {'source': name, 'counts': counts, 'dry_run': dry_run}
+    finally:
+        conn.close()
+        # Django connections are per thread; don't leave this worker's open.
+        connections[db_alias].close()
 
 
 def sync_reference_tables(source_name=None, dry_run=False, limit=None, verbose=False):
-    from reports.db import get_conn, get_sources
+    from reports.db import get_sources
     sources = get_sources()
     if source_name:
         sources = [s for s in sources if s.get('name') == source_name]
     if not sources:
         raise RuntimeError('No MariaDB sources configured for cache sync.')
 
-    summaries = []
-    for source in sources:
-        name = source.get('name')
-        logger.info("Starting cache sync for %s", name)
-        conn = get_conn(source_name=name)
-        try:
-            resellers = _fetch_rows(conn, "SELECT Reseller_Id, ResellerName, ISEnable FROM Hreseller")
-            visps = _fetch_rows(conn, "SELECT Visp_Id, VispName, ISEnable FROM Hvisp")
-            centers = _fetch_rows(conn, "SELECT Center_Id, CenterName, ISEnable, VispAccess FROM Hcenter")
-            supporters = _fetch_rows(conn, "SELECT Supporter_Id, SupporterName, ISEnable FROM Hsupporter")
-            statuses = _fetch_rows(conn, "SELECT Status_Id, StatusName, ISEnable, ResellerAccess, VispAccess FROM Hstatus")
-            services = _fetch_rows(conn, "SELECT Service_Id, ServiceName, ISEnable, IsDel, ResellerAccess, VispAccess FROM Hservice")
-            reseller_permits = _fetch_rows(conn, "SELECT Reseller_Permit_Id, Reseller_Id, Visp_Id, ISPermit, PermitItem_Id FROM Hreseller_permit")
-
-            service_reseller = _fetch_rows(conn, "SELECT Service_ResellerAccess_Id, Service_Id, Reseller_Id, Checked FROM Hservice_reselleraccess")
-            status_reseller = _fetch_rows(conn, "SELECT Status_ResellerAccess_Id, Status_Id, Reseller_Id, Checked FROM Hstatus_reselleraccess")
-            service_visp = _fetch_rows(conn, "SELECT Service_VispAccess_Id, Service_Id, Visp_Id, Checked FROM Hservice_vispaccess")
-            status_visp = _fetch_rows(conn, "SELECT Status_VispAccess_Id, Status_Id, Visp_Id, Checked FROM Hstatus_vispaccess")
-            center_visp = _fetch_rows(conn, "SELECT Center_VispAccess_Id, Center_Id, Visp_Id, Checked FROM Hcenter_vispaccess")
-
-            if limit and limit > 0:
-                resellers = resellers[:limit]
-                visps = visps[:limit]
-                centers = centers[:limit]
-                supporters = supporters[:limit]
-                statuses = statuses[:limit]
-                services = services[:limit]
-                reseller_permits = reseller_permits[:limit]
-                service_reseller = service_reseller[:limit]
-                status_reseller = status_reseller[:limit]
-                service_visp = service_visp[:limit]
-                status_visp = status_visp[:limit]
-                center_visp = center_visp[:limit]
-
-            counts = {
-                'resellers': len(resellers),
-                'visps': len(visps),
-                'centers': len(centers),
-                'supporters': len(supporters),
-                'statuses': len(statuses),
-                'services': len(services),
-                'reseller_permits': len(reseller_permits),
-                'service_reseller': len(service_reseller),
-                'status_reseller': len(status_reseller),
-                'service_visp': len(service_visp),
-                'status_visp': len(status_visp),
-                'center_visp': len(center_visp),
-            }
-            summaries.append({'source': name, 'counts': counts, 'dry_run': dry_run})
-
-            if verbose:
-                logger.info("Counts for %s: %s", name, counts)
-
-            if dry_run:
-                logger.info("Dry-run mode enabled; skipping writes for %s", name)
-                continue
-
-            batch_size = int(os.getenv('CACHE_SYNC_BATCH_SIZE', '1000'))
-            with transaction.atomic(using='cache'):
-                logger.info("Syncing %s resellers", len(resellers))
-                _replace_for_source(Reseller, name, resellers, lambda r: Reseller(
-                    source_name=name,
-                    source_id=r.get('Reseller_Id'),
-                    name=r.get('ResellerName') or '',
-                    name_norm=(r.get('ResellerName') or '').strip().lower(),
-                    is_enabled=_bool_yes(r.get('ISEnable')),
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s visps", len(visps))
-                _replace_for_source(Visp, name, visps, lambda r: Visp(
-                    source_name=name,
-                    source_id=r.get('Visp_Id'),
-                    name=r.get('VispName') or '',
-                    is_enabled=_bool_yes(r.get('ISEnable')),
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s centers", len(centers))
-                _replace_for_source(Center, name, centers, lambda r: Center(
-                    source_name=name,
-                    source_id=r.get('Center_Id'),
-                    name=r.get('CenterName') or '',
-                    is_enabled=_bool_yes(r.get('ISEnable')),
-                    visp_access=r.get('VispAccess') or 'All',
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s supporters", len(supporters))
-                _replace_for_source(Supporter, name, supporters, lambda r: Supporter(
-                    source_name=name,
-                    source_id=r.get('Supporter_Id'),
-                    name=r.get('SupporterName') or '',
-                    is_enabled=_bool_yes(r.get('ISEnable')),
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s statuses", len(statuses))
-                _replace_for_source(Status, name, statuses, lambda r: Status(
-                    source_name=name,
-                    source_id=r.get('Status_Id'),
-                    name=r.get('StatusName') or '',
-                    is_enabled=_bool_yes(r.get('ISEnable')),
-                    reseller_access=r.get('ResellerAccess') or 'All',
-                    visp_access=r.get('VispAccess') or 'All',
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s services", len(services))
-                _replace_for_source(Service, name, services, lambda r: Service(
-                    source_name=name,
-                    source_id=r.get('Service_Id'),
-                    name=r.get('ServiceName') or '',
-                    is_enabled=_bool_yes(r.get('ISEnable')),
-                    is_deleted=_bool_yes(r.get('IsDel')),
-                    reseller_access=r.get('ResellerAccess') or 'All',
-                    visp_access=r.get('VispAccess') or 'All',
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s reseller permits", len(reseller_permits))
-                _replace_for_source(ResellerPermit, name, reseller_permits, lambda r: ResellerPermit(
-                    source_name=name,
-                    reseller_id=r.get('Reseller_Id') or 0,
-                    visp_id=r.get('Visp_Id') or 0,
-                    permit_item_id=r.get('PermitItem_Id'),
-                    is_permit=_bool_yes(r.get('ISPermit')),
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s service-reseller access", len(service_reseller))
-                _replace_for_source(ServiceResellerAccess, name, service_reseller, lambda r: ServiceResellerAccess(
-                    source_name=name,
-                    service_id=r.get('Service_Id') or 0,
-                    reseller_id=r.get('Reseller_Id') or 0,
-                    checked=_bool_yes(r.get('Checked')),
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s status-reseller access", len(status_reseller))
-                _replace_for_source(StatusResellerAccess, name, status_reseller, lambda r: StatusResellerAccess(
-                    source_name=name,
-                    status_id=r.get('Status_Id') or 0,
-                    reseller_id=r.get('Reseller_Id') or 0,
-                    checked=_bool_yes(r.get('Checked')),
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s service-visp access", len(service_visp))
-                _replace_for_source(ServiceVispAccess, name, service_visp, lambda r: ServiceVispAccess(
-                    source_name=name,
-                    service_id=r.get('Service_Id') or 0,
-                    visp_id=r.get('Visp_Id') or 0,
-                    checked=_bool_yes(r.get('Checked')),
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s status-visp access", len(status_visp))
-                _replace_for_source(StatusVispAccess, name, status_visp, lambda r: StatusVispAccess(
-                    source_name=name,
-                    status_id=r.get('Status_Id') or 0,
-                    visp_id=r.get('Visp_Id') or 0,
-                    checked=_bool_yes(r.get('Checked')),
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-                logger.info("Syncing %s center-visp access", len(center_visp))
-                _replace_for_source(CenterVispAccess, name, center_visp, lambda r: CenterVispAccess(
-                    source_name=name,
-                    center_id=r.get('Center_Id') or 0,
-                    visp_id=r.get('Visp_Id') or 0,
-                    checked=_bool_yes(r.get('Checked')),
-                ), db_alias='cache', dry_run=dry_run, batch_size=batch_size)
-
-            logger.info("Maria cache sync completed for %s", name)
-        finally:
-            conn.close()
+    max_workers = max(1, min(len(sources), int(os.getenv('CACHE_SYNC_PARALLEL', '4'))))
+    results = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cache-sync') as executor:
+        futures = {
+            executor.submit(_sync_one_source, source, dry_run=dry_run, limit=limit, verbose=verbose): source.get('name')
+            for source in sources
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as exc:
+                logger.exception("Cache sync failed for %s", name)
+                errors.append(exc)
 
-    return summaries
+    if errors:
+        raise errors[0]
+    return [results[s.get('name')] for s in sources]
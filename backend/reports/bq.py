@@ -1,11 +1,21 @@
 import os
+import threading
 import pandas as pd
 from google.cloud import bigquery
 
+# Clients are reused per project: construction does credential discovery,
+# a token fetch and connection setup, which dominates short syncs/queries.
+_BQ_CLIENTS = {}
+_BQ_CLIENT_LOCK = threading.Lock()
 
-def get_bq_client():
-    project = os.getenv('BQ_PROJECT') or None
-    return bigquery.Client(project=project)
+
+def get_bq_client(project=None):
+    project = project or os.getenv('BQ_PROJECT') or None
+    with _BQ_CLIENT_LOCK:
+        client = _BQ_CLIENTS.get(project)
+        if client is None:
+            client = _BQ_CLIENTS[project] = bigquery.Client(project=project)
+        return client
 
 
 def get_bq_table_id():
@@ -1,4 +1,6 @@
 import os
+from functools import lru_cache
+
 import pandas as pd
 import pymysql
 
@@ -19,6 +21,8 @@ from maria_cache.models import (
 )
 
 
+# MARIA_SOURCES is read once per process; treat the returned list as read-only.
+@lru_cache(maxsize=1)
 def _parse_sources():
     sources_raw = os.getenv('MARIA_SOURCES', '').strip()
     if sources_raw:
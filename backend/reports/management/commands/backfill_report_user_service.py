@@ -1,18 +1,35 @@
 import os
 import uuid
-import tempfile
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+from functools import lru_cache
 
 import pandas as pd
 from django.core.management.base import BaseCommand
 from google.cloud import bigquery
 
-from reports.sync import _parse_sources, _fetch_maria_rows, _fetch_reseller_map, log_sync_event
+from reports.bq import get_bq_client
+from reports.sync import (
+    _concat_report_frames,
+    _fetch_maria_rows,
+    _fetch_reseller_map,
+    _load_report_df,
+    _parse_sources,
+    flush_sync_log,
+    log_sync_event,
+)
 
 logger = logging.getLogger(__name__)
+RESELLER_MAP_SCHEMA = (
+    bigquery.SchemaField('creator_norm', 'STRING'),
+    bigquery.SchemaField('rs_userid', 'INTEGER'),
+    bigquery.SchemaField('rs_name', 'STRING'),
+)
 
 
+# BigQuery env config is fixed for the process lifetime.
+@lru_cache(maxsize=1)
 def _get_bq_config():
     project = os.getenv('BQ_PROJECT')
     dataset = os.getenv('BQ_DATASET')
@@ -23,30 +40,6 @@ def _get_bq_config():
     return project, dataset, table, location
 
 
-def _load_df_to_bq(df, table_id, client, location, write_disposition):
-    job_config = bigquery.LoadJobConfig(
-        write_disposition=write_disposition,
-        autodetect=True,
-        source_format=bigquery.SourceFormat.CSV,
-    )
-    tmp_path = None
-    try:
-        with tempfile.NamedTemporaryFile(mode='w+', suffix='.csv', delete=False, encoding='utf-8') as tmp:
-            df.to_csv(tmp.name, index=False)
-            tmp_path = tmp.name
-        with open(tmp_path, 'rb') as handle:
-            load_job = client.load_table_from_file(
-                handle,
-                table_id,
-                job_config=job_config,
-                location=location,
-            )
-            load_job.result()
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.remove(tmp_path)
-
-
 class Command(BaseCommand):
     help = 'Backfill report_user_service from hspdata (< cutoff) plus MariaDB (>= cutoff).'
 
@@ -59,6 +52,12 @@ class Command(BaseCommand):
                             help='Full BigQuery target table ID (project.dataset.table).')
 
     def handle(self, *args, **options):
+        try:
+            return self._handle(**options)
+        finally:
+            flush_sync_log()
+
+    def _handle(self, **options):
         project, dataset, default_table, location = _get_bq_config()
         cutoff_date = options['cutoff_date']
         try:
@@ -79,40 +78,37 @@ class Command(BaseCommand):
         log_sync_event('backfill_start', 'Starting report_user_service backfill',
                        target_table=target_table, hsp_table=hsp_table, cutoff_date=cutoff_date)
 
-        client = bigquery.Client(project=project)
+        client = get_bq_client(project)
         stage_suffix = uuid.uuid4().hex
         maria_stage = f"{project}.{dataset}.report_user_service_maria_stage_{stage_suffix}"
         map_stage = f"{project}.{dataset}.report_user_service_reseller_map_{stage_suffix}"
 
         try:
-            maria_loaded = False
-            all_map = []
-            for source in sources:
-                df = _fetch_maria_rows(source, start_date=cutoff_date)
-                if not df.empty:
-                    write_disp = 'WRITE_TRUNCATE' if not maria_loaded else 'WRITE_APPEND'
-                    _load_df_to_bq(df, maria_stage, client, location, write_disp)
-                    maria_loaded = True
-                map_df = _fetch_reseller_map(source)
-                if not map_df.empty:
-                    all_map.append(map_df)
-
-            if not maria_loaded:
+            # Each source is a separate MariaDB host; fetch them all at once.
+            with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+                row_futures = [executor.submit(_fetch_maria_rows, s, start_date=cutoff_date) for s in sources]
+                map_futures = [executor.submit(_fetch_reseller_map, s) for s in sources]
+                # Results are taken in source order: the reseller map keeps the
+                # first source's entry for duplicate names.
+                all_dfs = [df for df in (f.result() for f in row_futures) if not df.empty]
+                all_map = [df for df in (f.result() for f in map_futures) if not df.empty]
+
+            if not all_dfs:
                 raise RuntimeError('No MariaDB rows returned for cutoff date.')
 
+            # One load job for all sources instead of a truncate plus N-1 appends.
+            maria_df = _concat_report_frames(all_dfs)
+            _load_report_df(maria_df, maria_stage, client, location, 'WRITE_TRUNCATE')
+            del all_dfs
+
             map_df = pd.concat(all_map, ignore_index=True) if all_map else pd.DataFrame()
             if not map_df.empty:
                 map_df = map_df[map_df['creator_norm'].notna()]
                 map_df = map_df[map_df['creator_norm'].astype(str).str.strip() != '']
                 map_df = map_df.drop_duplicates(subset=['creator_norm'], keep='first')
-                _load_df_to_bq(map_df, map_stage, client, location, 'WRITE_TRUNCATE')
+                _load_report_df(map_df, map_stage, client, location, 'WRITE_TRUNCATE', schema=RESELLER_MAP_SCHEMA)
             else:
-                schema = [
-                    bigquery.SchemaField('creator_norm', 'STRING'),
-                    bigquery.SchemaField('rs_userid', 'INTEGER'),
-                    bigquery.SchemaField('rs_name', 'STRING'),
-                ]
-                table = bigquery.Table(map_stage, schema=schema)
+                table = bigquery.Table(map_stage, schema=list(RESELLER_MAP_SCHEMA))
                 client.create_table(table)
 
             query = f"""
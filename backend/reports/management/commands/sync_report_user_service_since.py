@@ -1,19 +1,35 @@
 import os
 import time
 import uuid
-import tempfile
 import logging
 from datetime import date
+from functools import lru_cache
 
-import pandas as pd
 from django.core.management.base import BaseCommand
 from google.cloud import bigquery
 
-from reports.sync import _parse_sources, _fetch_maria_rows, log_sync_event
+from reports.bq import get_bq_client
+from reports.sync import (
+    ORDERED_COLS,
+    REPORT_BQ_TYPES,
+    _concat_report_frames,
+    _fetch_all_sources,
+    _load_report_df,
+    _parse_sources,
+    _sort_and_number,
+    flush_sync_log,
+    log_sync_event,
+)
 
 logger = logging.getLogger(__name__)
+# Windows up to this many rows are sent inline as an ARRAY<STRUCT> query
+# parameter instead of through a stage table. Kept well under the request
+# size limit for query parameters.
+INLINE_ROWS_MAX = int(os.getenv('BQ_INLINE_ROWS_MAX', '5000'))
 
 
+# BigQuery env config is fixed for the process lifetime.
+@lru_cache(maxsize=1)
 def _get_bq_config():
     project = os.getenv('BQ_PROJECT')
     dataset = os.getenv('BQ_DATASET')
@@ -24,28 +40,23 @@ def _get_bq_config():
     return project, dataset, table, location
 
 
-def _load_df_to_bq(df, table_id, client, location):
-    job_config = bigquery.LoadJobConfig(
-        write_disposition='WRITE_TRUNCATE',
-        autodetect=True,
-        source_format=bigquery.SourceFormat.CSV,
-    )
-    tmp_path = None
-    try:
-        with tempfile.NamedTemporaryFile(mode='w+', suffix='.csv', delete=False, encoding='utf-8') as tmp:
-            df.to_csv(tmp.name, index=False)
-            tmp_path = tmp.name
-        with open(tmp_path, 'rb') as handle:
-            load_job = client.load_table_from_file(
-                handle,
-                table_id,
-                job_config=job_config,
-                location=location,
-            )
-            load_job.result()
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.remove(tmp_path)
+def _rows_param(name, df, columns):
+    types = [REPORT_BQ_TYPES.get(c, 'STRING') for c in columns]
+    data = []
+    for col, bq_type in zip(columns, types):
+        series = df[col]
+        values = series.astype(object).where(series.notna(), None).tolist()
+        if bq_type == 'STRING':
+            values = [None if v is None else str(v) for v in values]
+        data.append(values)
+    rows = [
+        bigquery.StructQueryParameter(
+            None,
+            *(bigquery.ScalarQueryParameter(c, t, v) for c, t, v in zip(columns, types, values)),
+        )
+        for values in zip(*data)
+    ]
+    return bigquery.ArrayQueryParameter(name, 'STRUCT', rows)
 
 
 class Command(BaseCommand):
@@ -64,6 +75,12 @@ class Command(BaseCommand):
                             help='Full BigQuery target table ID (project.dataset.table).')
 
     def handle(self, *args, **options):
+        try:
+            return self._handle(**options)
+        finally:
+            flush_sync_log()
+
+    def _handle(self, **options):
         started_at = time.time()
         project, dataset, default_table, location = _get_bq_config()
         start_date = options['start_date']
@@ -75,13 +92,13 @@ class Command(BaseCommand):
         self.stdout.write(f'Window sync: start_date={start_date} end_date={end_date or "(none)"} limit={limit}')
 
         try:
-            date.fromisoformat(start_date)
+            start_date = date.fromisoformat(start_date).isoformat()
         except ValueError as exc:
             raise RuntimeError(f'Invalid start date: {start_date}') from exc
 
         if end_date:
             try:
-                date.fromisoformat(end_date)
+                end_date = date.fromisoformat(end_date).isoformat()
             except ValueError as exc:
                 raise RuntimeError(f'Invalid end date: {end_date}') from exc
 
@@ -108,111 +125,96 @@ class Command(BaseCommand):
             limit=limit,
         )
 
-        all_dfs = []
-        for source in sources:
-            try:
-                source_start = time.time()
-                self.stdout.write(f"Window sync: fetching rows from {source.get('name')}")
-                df = _fetch_maria_rows(
-                    source,
-                    limit=limit,
-                    start_date=start_date,
-                    end_date=end_date,
-                )
-                if not df.empty:
-                    all_dfs.append(df)
-                elapsed = time.time() - source_start
-                self.stdout.write(
-                    f"Window sync: source={source.get('name')} rows={len(df)} elapsed={elapsed:.2f}s"
-                )
-                log_sync_event(
-                    'window_source_success',
-                    'Fetched rows from source',
-                    source=source.get('name'),
-                    rows=len(df),
-                )
-            except Exception as exc:
-                logger.exception('Window sync: source failed: %s', source.get('name'))
-                self.stdout.write(self.style.ERROR(
-                    f"Window sync: source={source.get('name')} error={exc}"
-                ))
-                log_sync_event(
-                    'window_source_error',
-                    'Source fetch failed',
-                    source=source.get('name'),
-                    error=str(exc),
-                )
+        def on_start(source):
+            self.stdout.write(f"Window sync: fetching rows from {source.get('name')}")
+
+        def on_success(source, df, elapsed):
+            self.stdout.write(
+                f"Window sync: source={source.get('name')} rows={len(df)} elapsed={elapsed:.2f}s"
+            )
+            log_sync_event(
+                'window_source_success',
+                'Fetched rows from source',
+                source=source.get('name'),
+                rows=len(df),
+            )
+
+        def on_error(source, exc):
+            logger.exception('Window sync: source failed: %s', source.get('name'))
+            self.stdout.write(self.style.ERROR(
+                f"Window sync: source={source.get('name')} error={exc}"
+            ))
+            log_sync_event(
+                'window_source_error',
+                'Source fetch failed',
+                source=source.get('name'),
+                error=str(exc),
+            )
+
+        all_dfs = _fetch_all_sources(
+            sources, on_start, on_success, on_error,
+            limit=limit, start_date=start_date, end_date=end_date,
+        )
 
         if not all_dfs:
             self.stdout.write(self.style.WARNING('No rows returned from MariaDB.'))
             log_sync_event('window_sync_no_data', 'No data fetched from any source')
             return
 
-        df = pd.concat(all_dfs, ignore_index=True)
+        df = _concat_report_frames(all_dfs)
         self.stdout.write(f'Window sync: total rows fetched={len(df)}')
 
-        sort_cols = [c for c in ['rs_username', 'UserServiceID', 'CreateDate'] if c in df.columns]
+        df, sort_cols = _sort_and_number(df)
         if sort_cols:
-            ascending = [True] * len(sort_cols)
-            if 'CreateDate' in sort_cols:
-                ascending[sort_cols.index('CreateDate')] = False
-            df = df.sort_values(by=sort_cols, ascending=ascending, na_position='last')
             self.stdout.write(f"Window sync: sorted by {', '.join(sort_cols)}")
 
-        df = df.reset_index(drop=True)
-        df['id'] = range(1, len(df) + 1)
-
-        ordered_cols = [
-            'id',
-            'CreateDate',
-            'rs_userid',
-            'rs_username',
-            'rs_name',
-            'UserServiceID',
-            'username',
-            'ServiceName',
-            'ServicePrice',
-            'Package',
-            'ServiceStatus',
-            'StartDate',
-            'EndDate',
-        ]
-        ordered_cols = [c for c in ordered_cols if c in df.columns]
-        df = df[ordered_cols]
+        ordered_cols = [c for c in ORDERED_COLS if c in df.columns]
+        df = df.reindex(columns=ordered_cols)
         self.stdout.write(f"Window sync: columns={', '.join(ordered_cols)}")
 
-        client = bigquery.Client(project=project)
-        stage_table = f"{project}.{dataset}.report_user_service_stage_{uuid.uuid4().hex}"
-        self.stdout.write(f'Window sync: stage_table={stage_table}')
-        log_sync_event('window_stage_create', 'Created stage table id', stage_table=stage_table)
+        client = get_bq_client(project)
+        params = []
+
+        stage_table = None
+        if len(df) <= INLINE_ROWS_MAX:
+            # Small window: ship rows as a query parameter, no stage table/load job.
+            self.stdout.write(f'Window sync: inlining {len(df)} rows (<= {INLINE_ROWS_MAX})')
+            params.append(_rows_param('rows', df, ordered_cols))
+            source_sql = '(SELECT * FROM UNNEST(@rows))'
+        else:
+            stage_table = f"{project}.{dataset}.report_user_service_stage_{uuid.uuid4().hex}"
+            self.stdout.write(f'Window sync: stage_table={stage_table}')
+            log_sync_event('window_stage_create', 'Created stage table id', stage_table=stage_table)
+            source_sql = f'`{stage_table}`'
 
         try:
-            self.stdout.write('Window sync: loading stage table')
-            stage_start = time.time()
-            _load_df_to_bq(df, stage_table, client, location)
-            self.stdout.write(f'Window sync: stage load complete elapsed={time.time() - stage_start:.2f}s')
-
-            delete_where = 'CreateDate >= DATE(@start_date)'
+            if stage_table:
+                self.stdout.write('Window sync: loading stage table')
+                stage_start = time.time()
+                _load_report_df(df, stage_table, client, location, 'WRITE_TRUNCATE')
+                self.stdout.write(f'Window sync: stage load complete elapsed={time.time() - stage_start:.2f}s')
+
+            # Literal dates (normalized by fromisoformat above) let BigQuery
+            # prune partitions at plan time; parameters are opaque to it.
+            window = f"T.CreateDate >= DATE '{start_date}'"
             if end_date:
-                delete_where += ' AND CreateDate <= DATE(@end_date)'
+                window += f" AND T.CreateDate <= DATE '{end_date}'"
 
+            # One atomic MERGE: drop target rows in the window, insert every source row.
             cols_csv = ', '.join(ordered_cols)
+            values_csv = ', '.join(f'S.{c}' for c in ordered_cols)
             query = f"""
-BEGIN
-  DELETE FROM `{target_table}`
-  WHERE {delete_where};
-
-  INSERT INTO `{target_table}` ({cols_csv})
-  SELECT {cols_csv}
-  FROM `{stage_table}`;
-END;
+MERGE `{target_table}` T
+USING {source_sql} S
+ON FALSE
+WHEN NOT MATCHED BY SOURCE AND {window} THEN
+  DELETE
+WHEN NOT MATCHED BY TARGET THEN
+  INSERT ({cols_csv}) VALUES ({values_csv})
 """
-            params = [bigquery.ScalarQueryParameter('start_date', 'DATE', start_date)]
-            if end_date:
-                params.append(bigquery.ScalarQueryParameter('end_date', 'DATE', end_date))
             job_config = bigquery.QueryJobConfig(query_parameters=params)
 
-            self.stdout.write('Window sync: executing delete/insert on target')
+            self.stdout.write('Window sync: executing merge on target')
             query_job = client.query(query, job_config=job_config, location=location)
             query_job.result()
             self.stdout.write('Window sync: target update complete')
@@ -223,5 +225,6 @@ END;
                 f'Synced {len(df)} rows into {target_table} in {elapsed:.2f}s'
             ))
         finally:
-            self.stdout.write('Window sync: cleaning up stage table')
-            client.delete_table(stage_table, not_found_ok=True)
+            if stage_table:
+                self.stdout.write('Window sync: cleaning up stage table')
+                client.delete_table(stage_table, not_found_ok=True)
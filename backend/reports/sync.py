@@ -1,25 +1,135 @@
+import atexit
 import os
 import json
 import logging
-import tempfile
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime, timezone
 from google.cloud import bigquery
+import numpy as np
 import pandas as pd
 import pymysql
+from pandas.api.types import union_categoricals
 
-from pymysql.cursors import DictCursor
+from pymysql.cursors import DictCursor, SSCursor
+
+from .bq import get_bq_client
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
 
 logger = logging.getLogger(__name__)
 LOG_PATH = os.getenv('SYNC_LOG_PATH') or os.path.join(os.path.dirname(__file__), 'sync_logs.jsonl')
+FETCH_CHUNK = 50_000
+# Upper bound on concurrent per-source MariaDB fetches.
+FETCH_WORKERS = 8
+# Codec for the Parquet payload of BigQuery loads. snappy is cheap on CPU;
+# gzip/zstd trade CPU for fewer uploaded bytes on slow links.
+PARQUET_COMPRESSION = os.getenv('BQ_PARQUET_COMPRESSION', 'snappy')
+# Known dtypes for the report query; other columns are inferred.
+REPORT_DTYPES = {
+    'rs_userid': 'Int64',
+    'UserServiceID': 'Int64',
+    'ServicePrice': 'Float64',
+    'PackageBytes': 'Float64',
+}
+# Column order of the report table.
+ORDERED_COLS = (
+    'id',
+    'CreateDate',
+    'rs_userid',
+    'rs_username',
+    'rs_name',
+    'UserServiceID',
+    'username',
+    'ServiceName',
+    'ServicePrice',
+    'Package',
+    'ServiceStatus',
+    'StartDate',
+    'EndDate',
+)
+# BigQuery column types of the report table.
+REPORT_BQ_TYPES = {
+    'id': 'INT64',
+    'CreateDate': 'DATE',
+    'rs_userid': 'INT64',
+    'rs_username': 'STRING',
+    'rs_name': 'STRING',
+    'UserServiceID': 'INT64',
+    'username': 'STRING',
+    'ServiceName': 'STRING',
+    'ServicePrice': 'FLOAT64',
+    'Package': 'FLOAT64',
+    'ServiceStatus': 'STRING',
+    'StartDate': 'DATE',
+    'EndDate': 'DATE',
+}
+_REPORT_SCHEMA = tuple(bigquery.SchemaField(c, REPORT_BQ_TYPES[c]) for c in ORDERED_COLS)
+# Report row order: (column, ascending).
+REPORT_SORT = (
+    ('rs_username', True),
+    ('UserServiceID', True),
+    ('CreateDate', False),
+)
+
+# Events that end a sync run; the log is flushed after these (and after any
+# *_error event) so readers in other processes see the whole run. Everything
+# else rides the block buffer until then, or until the run's final
+# flush_sync_log().
+_FLUSH_EVENTS = {
+    'sync_loaded',
+    'sync_error',
+    'sync_no_data',
+    'window_sync_success',
+    'window_sync_no_data',
+    'backfill_success',
+}
+_LOG_HANDLE = None
+_LOG_LOCK = threading.Lock()
+_TAIL_BLOCK = 1 << 16
+if orjson is not None:
+    def _encode(entry):
+        return orjson.dumps(entry).decode('utf-8')
+else:
+    _encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+# Idle authenticated MariaDB connections keyed by (host, port, db, user).
+# Borrowing pops one, so concurrent fetches never share a connection.
+_CONN_POOL = {}
+_CONN_LOCK = threading.Lock()
+_CONN_IDLE_TIMEOUT = int(os.getenv('SYNC_CONN_IDLE_TIMEOUT', '300'))
+
+
+def _get_log_handle():
+    global _LOG_HANDLE
+    if _LOG_HANDLE is None:
+        log_dir = os.path.dirname(LOG_PATH)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        _LOG_HANDLE = open(LOG_PATH, 'a', buffering=1 << 16, encoding='utf-8')
+        atexit.register(_LOG_HANDLE.close)
+    return _LOG_HANDLE
 
 
 def _write_sync_log(entry):
-    log_dir = os.path.dirname(LOG_PATH)
-    if log_dir:
-        os.makedirs(log_dir, exist_ok=True)
-    with open(LOG_PATH, 'a', encoding='utf-8') as handle:
-        handle.write(json.dumps(entry, ensure_ascii=True) + '\n')
+    with _LOG_LOCK:
+        handle = _get_log_handle()
+        handle.write(_encode(entry) + '\n')
+        event_type = entry.get('type') or ''
+        if event_type in _FLUSH_EVENTS or event_type.endswith('_error'):
+            handle.flush()
+
+
+def flush_sync_log():
+    with _LOG_LOCK:
+        if _LOG_HANDLE is not None:
+            _LOG_HANDLE.flush()
 
 
 def log_sync_event(event_type, message, **data):
@@ -38,14 +148,23 @@ def log_sync_event(event_type, message, **data):
 def read_sync_logs(limit=200):
     if limit <= 0:
         return []
+    flush_sync_log()
     if not os.path.exists(LOG_PATH):
         return []
-    with open(LOG_PATH, 'r', encoding='utf-8') as handle:
-        lines = handle.readlines()
-    tail = lines[-limit:]
+    # Read backwards in blocks until we hold `limit` full lines, like `tail -n`,
+    # instead of loading the whole (ever-growing) log.
+    with open(LOG_PATH, 'rb') as handle:
+        pos = handle.seek(0, os.SEEK_END)
+        buf = b''
+        while pos > 0 and buf.count(b'\n') <= limit:
+            step = min(_TAIL_BLOCK, pos)
+            pos -= step
+            handle.seek(pos)
+            buf = handle.read(step) + buf
+    tail = buf.splitlines()[-limit:]
     entries = []
-    for line in tail:
-        line = line.strip()
+    for raw in tail:
+        line = raw.decode('utf-8', errors='replace').strip()
         if not line:
             continue
         try:
@@ -55,6 +174,8 @@ def read_sync_logs(limit=200):
     return entries
 
 
+# MARIA_SOURCES is read once per process; treat the returned list as read-only.
+@lru_cache(maxsize=1)
 def _parse_sources():
     sources_raw = os.getenv('MARIA_SOURCES', '').strip()
     if sources_raw:
@@ -89,6 +210,77 @@ def _parse_sources():
     }]
 
 
+def _connect_kwargs(source):
+    return {
+        'host': source['host'],
+        'port': source['port'],
+        'user': source['user'],
+        'password': source['password'],
+        'db': source['db'],
+        'charset': 'utf8mb4',
+        # Pooled connections must not hold a REPEATABLE READ snapshot between syncs.
+        'autocommit': True,
+    }
+
+
+def _discard_conn(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+@contextmanager
+def _maria_conn(source):
+    key = (source['host'], source['port'], source['db'], source['user'])
+    conn = None
+    expired = []
+    now = time.monotonic()
+    with _CONN_LOCK:
+        idle = _CONN_POOL.get(key, [])
+        while idle:
+            candidate, released_at = idle.pop()
+            if now - released_at <= _CONN_IDLE_TIMEOUT:
+                conn = candidate
+                break
+            expired.append(candidate)
+    for stale in expired:
+        _discard_conn(stale)
+    if conn is not None:
+        try:
+            conn.ping(reconnect=True)
+        except Exception:
+            _discard_conn(conn)
+            conn = None
+    if conn is None:
+        conn = pymysql.connect(**_connect_kwargs(source))
+
+    healthy = False
+    try:
+        yield conn
+        healthy = True
+    finally:
+        # A failed (possibly half-read streaming) connection is never reused.
+        if healthy and conn.open:
+            with _CONN_LOCK:
+                _CONN_POOL.setdefault(key, []).append((conn, time.monotonic()))
+        else:
+            _discard_conn(conn)
+
+
+# Columnar construction with explicit dtypes: no row->column transpose and no
+# object-dtype inference for the numeric fields.
+def _typed_frame(columns, data):
+    arrays = {}
+    for name, values in zip(columns, data):
+        dtype = REPORT_DTYPES.get(name)
+        if dtype == 'Float64':
+            # DECIMAL arrives as Decimal objects; numpy casts them (and None -> NaN) in C.
+            values = np.asarray(values, dtype='float64')
+        arrays[name] = pd.array(values, dtype=dtype)
+    return pd.DataFrame(arrays, columns=columns)
+
+
 def _fetch_maria_rows(source, limit=0, days=None, start_date=None, end_date=None):
     logger.info("Sync: fetching rows from %s (%s:%s/%s)", source.get('name'), source.get('host'), source.get('port'), source.get('db'))
     query = """
@@ -96,18 +288,14 @@ SELECT
     DATE(TName.CDT) AS CreateDate,
     TName.Creator_Id AS rs_userid,
     Hrc.ResellerName AS rs_username,
-    Hrc.ResellerName AS rs_name,
     TName.User_ServiceBase_Id AS UserServiceID,
     Hu.Username AS username,
     Hse.ServiceName AS ServiceName,
     TName.ServicePrice AS ServicePrice,
-    CASE
-        WHEN COALESCE(NULLIF(Hse.STrA, 0), NULLIF(Hse.MTrA, 0), NULLIF(Hse.DTrA, 0), NULLIF(Hse.YTrA, 0), NULLIF(Hse.ExtraTraffic, 0)) IS NULL THEN NULL
-        ELSE ROUND(COALESCE(NULLIF(Hse.STrA, 0), NULLIF(Hse.MTrA, 0), NULLIF(Hse.DTrA, 0), NULLIF(Hse.YTrA, 0), NULLIF(Hse.ExtraTraffic, 0)) / 1073741824, 2)
-    END AS Package,
+    COALESCE(NULLIF(Hse.STrA, 0), NULLIF(Hse.MTrA, 0), NULLIF(Hse.DTrA, 0), NULLIF(Hse.YTrA, 0), NULLIF(Hse.ExtraTraffic, 0)) AS PackageBytes,
     TName.ServiceStatus AS ServiceStatus,
-    DATE_FORMAT(NULLIF(TName.StartDate, '0000-00-00'), '%%Y-%%m-%%d') AS StartDate,
-    DATE_FORMAT(NULLIF(TName.EndDate, '0000-00-00'), '%%Y-%%m-%%d') AS EndDate
+    DATE(NULLIF(TName.StartDate, '0000-00-00')) AS StartDate,
+    DATE(NULLIF(TName.EndDate, '0000-00-00')) AS EndDate
 FROM Huser_servicebase TName
 JOIN Huser Hu ON TName.User_Id = Hu.User_Id
 LEFT JOIN Hreseller Hrc ON TName.Creator_Id = Hrc.Reseller_Id
@@ -136,50 +324,105 @@ LEFT JOIN Hservice Hse ON TName.Service_Id = Hse.Service_Id
     if filters:
         query += "\nWHERE " + " AND ".join(filters)
 
-    query += "\nORDER BY TName.CDT DESC"
+    # Callers re-sort in pandas, so the server-side sort only matters for
+    # "most recent N" when a limit is applied.
     if limit and limit > 0:
-        query += f"\nLIMIT {int(limit)}"
-
-    conn = pymysql.connect(
-        host=source['host'],
-        port=source['port'],
-        user=source['user'],
-        password=source['password'],
-        db=source['db'],
-        charset='utf8mb4',
-        cursorclass=DictCursor,
-    )
+        query += f"\nORDER BY TName.CDT DESC\nLIMIT {int(limit)}"
+
     try:
-        with conn.cursor() as cur:
+        with _maria_conn(source) as conn, conn.cursor(SSCursor) as cur:
             cur.execute(query, params)
-            rows = cur.fetchall()
-            df = pd.DataFrame(rows)
-            if not df.empty:
-                df['rs_name'] = source['name']
-                df['id'] = range(1, len(df) + 1)
-                ordered_cols = [
-                    'id',
-                    'CreateDate',
-                    'rs_userid',
-                    'rs_username',
-                    'rs_name',
-                    'UserServiceID',
-                    'username',
-                    'ServiceName',
-                    'ServicePrice',
-                    'Package',
-                    'ServiceStatus',
-                    'StartDate',
-                    'EndDate',
-                ]
-                df = df[ordered_cols]
+            # Unbuffered cursor: append each chunk straight into per-column
+            # lists and build typed arrays once, skipping per-chunk frames.
+            columns = [col[0] for col in cur.description]
+            data = [[] for _ in columns]
+            while True:
+                batch = cur.fetchmany(FETCH_CHUNK)
+                if not batch:
+                    break
+                for values, chunk in zip(data, zip(*batch)):
+                    values.extend(chunk)
+            df = _typed_frame(columns, data)
+            del data
+            # GiB conversion runs here as one vectorized divide rather than per row in SQL.
+            df['Package'] = (df.pop('PackageBytes') / (1 << 30)).round(2)
+            # One category per source: int8 codes instead of a repeated string per row.
+            df['rs_name'] = pd.Categorical.from_codes(
+                np.zeros(len(df), dtype=np.int8),
+                categories=[source['name']],
+            )
+            # `id` and column order are assigned once by callers after concat.
             logger.info("Sync: fetched %s rows from %s", len(df), source.get('name'))
             return df
     except Exception:
         logger.exception("Sync: failed to fetch rows from %s", source.get('name'))
         raise
-    finally:
-        conn.close()
+
+
+def _fetch_all_sources(sources, on_start, on_success, on_error, **fetch_kwargs):
+    # Run _fetch_maria_rows for every source on a thread pool. The callbacks
+    # run on the calling thread (on_error inside the except block, so
+    # logger.exception works); a failed source is reported and skipped.
+    # Returns the non-empty frames in source order, so ties in the later sort
+    # stay deterministic.
+    def _fetch(source):
+        started = time.monotonic()
+        return _fetch_maria_rows(source, **fetch_kwargs), time.monotonic() - started
+
+    frames = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(sources), FETCH_WORKERS))) as executor:
+        futures = {}
+        for index, source in enumerate(sources):
+            on_start(source)
+            futures[executor.submit(_fetch, source)] = (index, source)
+        for future in as_completed(futures):
+            index, source = futures[future]
+            try:
+                df, elapsed = future.result()
+            except Exception as exc:
+                on_error(source, exc)
+                continue
+            on_success(source, df, elapsed)
+            if not df.empty:
+                frames[index] = df
+    return [frames[i] for i in sorted(frames)]
+
+
+def _concat_report_frames(frames):
+    # pd.concat widens differing categoricals to object; union the per-source
+    # rs_name categories instead so the combined column stays categorical.
+    rs_name = union_categoricals([f['rs_name'] for f in frames])
+    df = pd.concat([f.drop(columns='rs_name') for f in frames], ignore_index=True)
+    df['rs_name'] = rs_name
+    return df
+
+
+def _sort_key(values, ascending):
+    # lexsort key with NA last in either direction. Numeric columns are used
+    # as-is (NaN already sorts last, so negation gives descending order);
+    # everything else is reduced to dense sort-rank codes.
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        keys = values.to_numpy(dtype='float64', na_value=np.nan)
+        return keys if ascending else -keys
+    codes, uniques = pd.factorize(values, sort=True)
+    n = len(uniques)
+    if not ascending:
+        codes = np.where(codes >= 0, n - 1 - codes, codes)
+    codes[codes < 0] = n
+    return codes
+
+
+def _sort_and_number(df):
+    # One lexsort permutation + gather instead of sort_values/reset_index,
+    # then a contiguous int64 id. Returns the frame and the columns sorted on.
+    sort_cols = [(c, asc) for c, asc in REPORT_SORT if c in df.columns]
+    if sort_cols:
+        # np.lexsort treats the last key as the primary one.
+        idx = np.lexsort([_sort_key(df[c], asc) for c, asc in reversed(sort_cols)])
+        df = df.take(idx)
+    df.index = pd.RangeIndex(len(df))
+    df['id'] = np.arange(1, len(df) + 1, dtype=np.int64)
+    return df, [c for c, _ in sort_cols]
 
 
 def _fetch_reseller_map(source):
@@ -189,17 +432,8 @@ SELECT Reseller_Id, ResellerName
 FROM Hreseller
 WHERE ResellerName IS NOT NULL AND ResellerName <> ''
 """
-    conn = pymysql.connect(
-        host=source['host'],
-        port=source['port'],
-        user=source['user'],
-        password=source['password'],
-        db=source['db'],
-        charset='utf8mb4',
-        cursorclass=DictCursor,
-    )
     try:
-        with conn.cursor() as cur:
+        with _maria_conn(source) as conn, conn.cursor(DictCursor) as cur:
             cur.execute(query)
             rows = cur.fetchall()
             df = pd.DataFrame(rows)
@@ -212,11 +446,40 @@ WHERE ResellerName IS NOT NULL AND ResellerName <> ''
     except Exception:
         logger.exception("Sync: failed to fetch reseller map from %s", source.get('name'))
         raise
-    finally:
-        conn.close()
+
+
+def _load_report_df(df, table_id, client, location, write_disposition, schema=_REPORT_SCHEMA):
+    # Explicit schema: no type inference and stable column types between runs.
+    # The client converts column by column against it, so categoricals go
+    # over as plain strings.
+    categorical = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if categorical:
+        df = df.astype({c: 'str' for c in categorical})
+    job_config = bigquery.LoadJobConfig(
+        schema=[field for field in schema if field.name in df.columns],
+        write_disposition=write_disposition,
+        source_format=bigquery.SourceFormat.PARQUET,
+    )
+    load_job = client.load_table_from_dataframe(
+        df,
+        table_id,
+        job_config=job_config,
+        location=location,
+        parquet_compression=PARQUET_COMPRESSION,
+    )
+    load_job.result()
 
 
 def sync_maria_to_bigquery(limit=0, write_disposition='WRITE_TRUNCATE', days=None, auto=False):
+    # The view runs this in whichever web worker took the request; flush even
+    # when the run fails early so the other workers' log views see it.
+    try:
+        return _sync_maria_to_bigquery(limit, write_disposition, days, auto)
+    finally:
+        flush_sync_log()
+
+
+def _sync_maria_to_bigquery(limit, write_disposition, days, auto):
     project = os.getenv('BQ_PROJECT')
     dataset = os.getenv('BQ_DATASET')
     table = os.getenv('BQ_TABLE')
@@ -239,92 +502,55 @@ def sync_maria_to_bigquery(limit=0, write_disposition='WRITE_TRUNCATE', days=Non
         auto=auto,
         write_disposition=write_disposition,
     )
-    all_dfs = []
-    for source in sources:
-        try:
-            log_sync_event(
-                'source_start',
-                'Fetching rows from source',
-                source=source.get('name'),
-                host=source.get('host'),
-                db=source.get('db'),
-            )
-            df = _fetch_maria_rows(source, limit=limit, days=days)
-            log_sync_event(
-                'source_success',
-                'Fetched rows from source',
-                source=source.get('name'),
-                rows=len(df),
-            )
-            if not df.empty:
-                all_dfs.append(df)
-        except Exception as exc:
-            logger.exception("Sync: source failed: %s", source.get('name'))
-            log_sync_event(
-                'source_error',
-                'Source fetch failed',
-                source=source.get('name'),
-                error=str(exc),
-            )
+    def on_start(source):
+        log_sync_event(
+            'source_start',
+            'Fetching rows from source',
+            source=source.get('name'),
+            host=source.get('host'),
+            db=source.get('db'),
+        )
+
+    def on_success(source, df, elapsed):
+        log_sync_event(
+            'source_success',
+            'Fetched rows from source',
+            source=source.get('name'),
+            rows=len(df),
+        )
+
+    def on_error(source, exc):
+        logger.exception("Sync: source failed: %s", source.get('name'))
+        log_sync_event(
+            'source_error',
+            'Source fetch failed',
+            source=source.get('name'),
+            error=str(exc),
+        )
+
+    all_dfs = _fetch_all_sources(
+        sources, on_start, on_success, on_error, limit=limit, days=days,
+    )
 
     if not all_dfs:
         logger.warning("Sync: no data fetched from any source")
         log_sync_event('sync_no_data', 'No data fetched from any source')
         return 0
 
-    df = pd.concat(all_dfs, ignore_index=True)
+    df = _concat_report_frames(all_dfs)
 
     # sort by reseller username then date for easier grouping in BigQuery
-    sort_cols = [c for c in ['rs_username', 'UserServiceID', 'CreateDate'] if c in df.columns]
-    if sort_cols:
-        ascending = [True] * len(sort_cols)
-        if 'CreateDate' in sort_cols:
-            ascending[sort_cols.index('CreateDate')] = False
-        df = df.sort_values(by=sort_cols, ascending=ascending, na_position='last')
-
-    df = df.reset_index(drop=True)
-    df['id'] = range(1, len(df) + 1)
-
-    ordered_cols = [
-        'id',
-        'CreateDate',
-        'rs_userid',
-        'rs_username',
-        'rs_name',
-        'UserServiceID',
-        'username',
-        'ServiceName',
-        'ServicePrice',
-        'Package',
-        'ServiceStatus',
-        'StartDate',
-        'EndDate',
-    ]
-    ordered_cols = [c for c in ordered_cols if c in df.columns]
+    df, _ = _sort_and_number(df)
+
+    ordered_cols = [c for c in ORDERED_COLS if c in df.columns]
     if ordered_cols:
-        df = df[ordered_cols]
+        df = df.reindex(columns=ordered_cols)
 
-    client = bigquery.Client(project=project)
-    job_config = bigquery.LoadJobConfig(
-        write_disposition=write_disposition,
-        autodetect=True,
-        source_format=bigquery.SourceFormat.CSV,
-    )
+    client = get_bq_client(project)
 
     try:
-        with tempfile.NamedTemporaryFile(mode='w+', suffix='.csv', delete=False, encoding='utf-8') as tmp:
-            df.to_csv(tmp.name, index=False)
-            tmp.flush()
-            tmp.seek(0)
-            with open(tmp.name, 'rb') as fh:
-                load_job = client.load_table_from_file(
-                    fh,
-                    table_id,
-                    job_config=job_config,
-                    location=location,
-                )
-                load_job.result()
-                logger.info("Sync: loaded %s rows into %s", len(df), table_id)
+        _load_report_df(df, table_id, client, location, write_disposition)
+        logger.info("Sync: loaded %s rows into %s", len(df), table_id)
         log_sync_event('sync_loaded', 'Loaded rows into BigQuery', rows=len(df), table_id=table_id, auto=auto)
         return len(df)
     except Exception as exc: